@@ -6,19 +6,24 @@ It includes tools, agent logic, chat handling, and the main app.
 """
 
 from .main import app
-from .tools import AVAILABLE_TOOLS, TOOL_DESCRIPTIONS
+from .tools import AVAILABLE_TOOLS, TOOL_BY_NAME, TOOL_DESCRIPTIONS
 from .agent import create_agent, run_agent
 from .chat import ChatRequest, ChatResponse, handle_chat
+from .cache import SemanticCache
+from .limiter import AgentRunLimiter
 
 __version__ = "1.0.0"
 
 __all__ = [
     "app",
     "AVAILABLE_TOOLS", 
+    "TOOL_BY_NAME",
     "TOOL_DESCRIPTIONS",
     "create_agent",
     "run_agent", 
     "ChatRequest",
     "ChatResponse",
-    "handle_chat"
+    "handle_chat",
+    "SemanticCache",
+    "AgentRunLimiter"
 ] 
\ No newline at end of file
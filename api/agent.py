@@ -6,20 +6,122 @@ It handles the creation and compilation of the agent graph with tools.
 """
 
 import os
+import json
+import asyncio
+from functools import lru_cache, wraps
 from typing import TypedDict, Annotated
 
+import httpx
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode
 
 # Import with fallback for both local and Vercel environments
 try:
-    from .tools import AVAILABLE_TOOLS
+    from .tools import AVAILABLE_TOOLS, TOOL_BY_NAME, NON_DETERMINISTIC_TOOLS
 except ImportError:
     # Fallback for local development
-    from api.tools import AVAILABLE_TOOLS
+    from api.tools import AVAILABLE_TOOLS, TOOL_BY_NAME, NON_DETERMINISTIC_TOOLS
+
+
+# Shared HTTP clients so OpenAI calls reuse keep-alive (HTTP/2) connections
+# across agents and requests instead of opening a new TLS session each time.
+# The sync client lives for the whole process; the async client's connections
+# belong to the event loop that opened them, so it is scoped to the running
+# loop (a serverless runtime or test client may use a new loop per request).
+_HTTPX_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+_http_client = None
+_http_async_client = None
+_scope_loop = None
+_loop_scoped_caches = []
+
+
+def _running_loop():
+    """Return the running event loop, or None when called outside one."""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _sync_loop_scope():
+    """Drop the async client and loop-scoped caches if the running loop changed."""
+    global _scope_loop, _http_async_client
+    loop = _running_loop()
+    if loop is not _scope_loop:
+        _scope_loop = loop
+        _http_async_client = None
+        for cache in _loop_scoped_caches:
+            cache.cache_clear()
+
+
+def loop_scoped_cache(maxsize: int = 32):
+    """
+    lru_cache whose entries are dropped whenever the running event loop changes.
+    
+    Use it for anything that holds the async HTTP client (models, agents,
+    embedders), so cached objects never carry connections across loops.
+    """
+    def decorator(func):
+        cached = lru_cache(maxsize=maxsize)(func)
+        _loop_scoped_caches.append(cached)
+        
+        @wraps(func)
+        def wrapper(*args):
+            _sync_loop_scope()
+            return cached(*args)
+        
+        wrapper.cache_clear = cached.cache_clear
+        return wrapper
+    return decorator
+
+
+def get_http_clients():
+    """Return the shared (sync, async) OpenAI HTTP clients, creating them on first use."""
+    global _http_client, _http_async_client
+    _sync_loop_scope()
+    if _http_client is None:
+        _http_client = httpx.Client(http2=True, timeout=30, limits=_HTTPX_LIMITS)
+    if _http_async_client is None:
+        _http_async_client = httpx.AsyncClient(http2=True, timeout=30, limits=_HTTPX_LIMITS)
+    return _http_client, _http_async_client
+
+
+async def close_http_clients():
+    """
+    Close the shared OpenAI HTTP clients (called on application shutdown).
+    
+    Cached models hold references to the clients, so the model cache is
+    cleared too; the next request builds fresh clients and models.
+    """
+    global _http_client, _http_async_client
+    clear_model_cache()
+    if _http_client is not None:
+        _http_client.close()
+        _http_client = None
+    # Only the current loop's client can be closed from here; clients of
+    # earlier loops were already dropped when the loop changed
+    _sync_loop_scope()
+    if _http_async_client is not None:
+        await _http_async_client.aclose()
+        _http_async_client = None
+
+
+# Constant system prompt sent first on every model call. It is kept
+# byte-identical (no timestamps or per-request data) so the request prefix
+# stays stable; OpenAI only caches prompts of 1024+ tokens, which this prefix
+# plus the tool schemas does not reach yet, so it is not a caching win today.
+SYSTEM_PROMPT = SystemMessage(content=(
+    "You are a helpful assistant. Use the available tools when they help answer "
+    "the user's question: get_weather for weather reports, wiki_search for "
+    "Wikipedia summaries, fun_fact for fun facts and random_color to pick a "
+    "color from a list."
+))
+
+
+# Returned by run_agent when the run produced no answer
+NO_RESPONSE_MESSAGE = "I apologize, but I couldn't generate a response."
 
 
 class AgentState(TypedDict):
@@ -27,6 +129,68 @@ class AgentState(TypedDict):
     messages: Annotated[list, add_messages]
 
 
+async def _dispatch(name: str, args: dict) -> str:
+    """Run a single tool and return its output as a string."""
+    tool = TOOL_BY_NAME.get(name)
+    try:
+        if tool is None:
+            raise ValueError(f"Unknown tool: {name}")
+        output = await tool.ainvoke(args)
+    except Exception as e:
+        output = f"Tool {name} failed: {str(e)}"
+    return str(output)
+
+
+async def tool_node(state):
+    """
+    Execute all tool calls from the last model turn concurrently.
+    
+    Identical calls (same tool and arguments) are run once and their result
+    is returned for each tool_call_id, except for non-deterministic tools,
+    where every call runs on its own. Sync tools are run in the default
+    executor by ainvoke, so independent calls overlap and the turn takes as
+    long as the slowest tool.
+    """
+    tool_calls = state["messages"][-1].tool_calls
+    keys = [
+        (tc["name"], tc["id"]) if tc["name"] in NON_DETERMINISTIC_TOOLS
+        else (tc["name"], json.dumps(tc["args"], sort_keys=True))
+        for tc in tool_calls
+    ]
+    unique_calls = {}
+    for key, tc in zip(keys, tool_calls):
+        unique_calls.setdefault(key, tc)
+    
+    outputs = await asyncio.gather(*[_dispatch(tc["name"], tc["args"]) for tc in unique_calls.values()])
+    output_by_key = dict(zip(unique_calls, outputs))
+    
+    return {
+        "messages": [
+            ToolMessage(content=output_by_key[key], name=tc["name"], tool_call_id=tc["id"])
+            for key, tc in zip(keys, tool_calls)
+        ]
+    }
+
+
+@loop_scoped_cache(maxsize=32)
+def _bound_model(api_key: str):
+    """Build the chat model with tools bound, once per API key and event loop."""
+    http_client, http_async_client = get_http_clients()
+    model = ChatOpenAI(
+        model="gpt-4o-mini",
+        temperature=0,
+        api_key=api_key,
+        http_client=http_client,
+        http_async_client=http_async_client
+    )
+    return model.bind_tools(AVAILABLE_TOOLS)
+
+
+def clear_model_cache():
+    """Drop all cached tool-bound models."""
+    _bound_model.cache_clear()
+
+
 def create_agent(api_key: str = None):
     """
     Create and compile a LangGraph agent with the provided API key.
@@ -45,17 +209,13 @@ def create_agent(api_key: str = None):
     if not openai_api_key:
         raise ValueError("OpenAI API key is required")
     
-    # Initialize model with the provided API key
-    model = ChatOpenAI(model="gpt-4o-mini", temperature=0, api_key=openai_api_key)
-    model = model.bind_tools(AVAILABLE_TOOLS)
-    
-    # Create tool node
-    tool_node = ToolNode(AVAILABLE_TOOLS)
+    # Get the tool-bound model for the provided API key
+    model = _bound_model(openai_api_key)
     
     # Define the agent node that calls the model
-    def call_model(state):
+    async def call_model(state):
         messages = state["messages"]
-        response = model.invoke(messages)
+        response = await model.ainvoke([SYSTEM_PROMPT] + messages)
         return {"messages": [response]}
     
     # Build and compile the LangGraph
@@ -73,6 +233,28 @@ def create_agent(api_key: str = None):
     return graph.compile()
 
 
+def _extract_result(messages: list) -> dict:
+    """
+    Build the run_agent result from the final message list of a run.
+    
+    The response is the text of the terminal AI message (the last message,
+    with no tool calls). Intermediate AI messages sent alongside tool calls
+    are never used as the answer; if there is no terminal text, the
+    NO_RESPONSE_MESSAGE fallback is returned.
+    """
+    final_message = messages[-1] if messages else None
+    final_response = ""
+    if (isinstance(final_message, AIMessage) and not final_message.tool_calls
+            and isinstance(final_message.content, str)):
+        final_response = final_message.content
+    tool_calls_made = [tc["name"] for msg in messages for tc in (getattr(msg, "tool_calls", None) or ())]
+    
+    return {
+        "response": final_response or NO_RESPONSE_MESSAGE,
+        "tool_calls": tool_calls_made
+    }
+
+
 async def run_agent(agent, message: str):
     """
     Run the agent with a given message and return the response.
@@ -87,55 +269,7 @@ async def run_agent(agent, message: str):
     # Prepare input for the agent
     inputs = {"messages": [HumanMessage(content=message)]}
     
-    # Stream through the graph and collect responses
-    tool_calls_made = []
-    final_response = ""
-    
-    async for chunk in agent.astream(inputs, stream_mode="updates"):
-        for node, values in chunk.items():
-            if node == "action" and values.get("messages"):
-                # Track tool calls
-                for msg in values["messages"]:
-                    if hasattr(msg, 'name'):
-                        tool_calls_made.append(msg.name)
-            elif node == "agent" and values.get("messages"):
-                # Get the final response
-                last_message = values["messages"][-1]
-                if hasattr(last_message, 'content') and last_message.content:
-                    final_response = last_message.content
-    
-    # If no final response was captured, get it from the last message
-    if not final_response:
-        final_state = agent.invoke(inputs)
-        if final_state.get("messages"):
-            final_response = final_state["messages"][-1].content
-    
-    return {
-        "response": final_response or "I apologize, but I couldn't generate a response.",
-        "tool_calls": tool_calls_made
-    }
-
-
-# Global agent instance (initialized at startup if API key is available)
-_global_agent = None
-
-
-def initialize_global_agent():
-    """Initialize the global agent if an API key is available in environment."""
-    global _global_agent
-    try:
-        if os.getenv("OPENAI_API_KEY"):
-            _global_agent = create_agent()
-            print("LangGraph agent initialized successfully with environment API key")
-            return True
-        else:
-            print("No environment API key found - will require API key from requests")
-            return False
-    except Exception as e:
-        print(f"Failed to initialize global agent: {e}")
-        return False
-
-
-def get_global_agent():
-    """Get the global agent instance."""
-    return _global_agent 
\ No newline at end of file
+    # Run the graph once (without blocking the event loop) and read the
+    # result from the final state; there is never a second run
+    state = await agent.ainvoke(inputs)
+    return _extract_result(state.get("messages", []))
@@ -0,0 +1,136 @@
+"""
+Semantic Response Cache
+
+This module contains an in-memory semantic cache for chat responses.
+User messages are embedded and compared by cosine similarity, so repeated
+or near-duplicate questions can be answered without running the agent.
+"""
+
+import time
+import logging
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+from langchain_openai import OpenAIEmbeddings
+
+# Import with fallback for both local and Vercel environments
+try:
+    from .agent import get_http_clients, loop_scoped_cache
+except ImportError:
+    # Fallback for local development
+    from api.agent import get_http_clients, loop_scoped_cache
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+SIMILARITY_THRESHOLD = 0.95
+# Same lifetime as the wiki_search tool cache so stale answers expire with it
+RESPONSE_TTL = 600
+
+
+@loop_scoped_cache(maxsize=32)
+def _get_embedder(api_key: str) -> OpenAIEmbeddings:
+    """Get the embeddings client for an API key, sharing the loop-scoped HTTP clients."""
+    http_client, http_async_client = get_http_clients()
+    return OpenAIEmbeddings(
+        model=EMBEDDING_MODEL,
+        api_key=api_key,
+        http_client=http_client,
+        http_async_client=http_async_client
+    )
+
+
+def clear_embedder_cache():
+    """Drop all cached embeddings clients."""
+    _get_embedder.cache_clear()
+
+
+class SemanticCache:
+    """
+    In-memory cache mapping message embeddings to chat responses.
+
+    Embeddings are stored as unit vectors in a fixed-size numpy matrix, so a
+    lookup is a single matrix-vector product. Entries expire after `ttl`
+    seconds, and once full the oldest entries are overwritten first.
+    """
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD, max_entries: int = 256,
+                 ttl: float = RESPONSE_TTL):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._embeddings = None
+        self._stored_at = np.zeros(max_entries)
+        self._responses = [None] * max_entries
+        self._count = 0
+        self._next = 0
+
+    async def embed(self, message: str, api_key: str) -> Optional[np.ndarray]:
+        """
+        Embed a message as a unit vector.
+
+        Returns:
+            The normalized embedding, or None if embedding failed (the cache
+            is then simply bypassed for this request).
+        """
+        try:
+            vector = await _get_embedder(api_key).aembed_query(message)
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed, bypassing cache: {e}")
+            return None
+
+        embedding = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else None
+
+    def lookup(self, embedding: Optional[np.ndarray]):
+        """Return the cached response most similar to the embedding, if above threshold."""
+        if embedding is None or not self._count:
+            return None
+
+        similarities = self._embeddings[:self._count] @ embedding
+        expired = time.monotonic() - self._stored_at[:self._count] >= self.ttl
+        similarities[expired] = -np.inf
+        best = int(np.argmax(similarities))
+        if similarities[best] > self.threshold:
+            return self._responses[best]
+        return None
+
+    def add(self, embedding: Optional[np.ndarray], response):
+        """Store a response under the given embedding."""
+        if embedding is None:
+            return
+
+        if self._embeddings is None:
+            self._embeddings = np.zeros((self.max_entries, embedding.shape[0]), dtype=np.float32)
+
+        self._embeddings[self._next] = embedding
+        self._stored_at[self._next] = time.monotonic()
+        self._responses[self._next] = response
+        self._next = (self._next + 1) % self.max_entries
+        self._count = min(self._count + 1, self.max_entries)
+
+    def clear(self):
+        """Remove all cached responses."""
+        self._embeddings = None
+        self._stored_at = np.zeros(self.max_entries)
+        self._responses = [None] * self.max_entries
+        self._count = 0
+        self._next = 0
+
+
+@lru_cache(maxsize=32)
+def get_response_cache(key_hash: str) -> SemanticCache:
+    """
+    Get the cache partition for one API key.
+
+    Responses are never shared between keys, so one user's answers cannot be
+    returned to another.
+    """
+    return SemanticCache()
+
+
+def clear_response_caches():
+    """Drop the cached responses of every API key."""
+    get_response_cache.cache_clear()
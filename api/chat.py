@@ -5,30 +5,127 @@ This module contains the chat endpoint for the LangGraph agent.
 It handles incoming chat requests and returns agent responses.
 """
 
+import os
+import re
+import time
+import hashlib
+import logging
+
+import tiktoken
 from fastapi import HTTPException
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
 
 # Import with fallback for both local and Vercel environments
 try:
-    from .agent import create_agent, run_agent, get_global_agent
+    from .agent import create_agent, clear_model_cache, loop_scoped_cache, NO_RESPONSE_MESSAGE
+    from .cache import get_response_cache, clear_embedder_cache, clear_response_caches
+    from .tools import NON_DETERMINISTIC_TOOLS
+    from .limiter import agent_limiter
 except ImportError:
     # Fallback for local development
-    from api.agent import create_agent, run_agent, get_global_agent
+    from api.agent import create_agent, clear_model_cache, loop_scoped_cache, NO_RESPONSE_MESSAGE
+    from api.cache import get_response_cache, clear_embedder_cache, clear_response_caches
+    from api.tools import NON_DETERMINISTIC_TOOLS
+    from api.limiter import agent_limiter
+
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_TOKENS = 8000
+# Abuse bound checked before tokenizing: far above what MAX_MESSAGE_TOKENS
+# allows for real text, so it only cuts off obviously huge input and the
+# token count stays the actual limit
+MAX_MESSAGE_CHARS = 20 * MAX_MESSAGE_TOKENS
+
+# Bare greetings are answered directly without an LLM round-trip
+_GREETING_RE = re.compile(r"^(hi|hello|hey|hiya|howdy)( there)?[!.\s]*$", re.IGNORECASE)
+GREETING_RESPONSE = "Hello! Ask me about the weather, Wikipedia topics, fun facts, or to pick a random color."
 
 
 class ChatRequest(BaseModel):
     """Request model for chat endpoint."""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     message: str
-    openai_api_key: str = None  # Optional API key from frontend
+    api_key: Optional[str] = None
+    openai_api_key: Optional[str] = None  # Optional API key from frontend
+    no_cache: bool = False  # Bypass the semantic response cache
 
 
 class ChatResponse(BaseModel):
     """Response model for chat endpoint."""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+    
     response: str
     tool_calls: List[str] = []
 
 
+# Tokenizer for the length pre-check, loaded on first use; failed loads are
+# retried at most once per interval instead of disabling the check for good
+_encoder = None
+_encoder_failed_at = None
+_ENCODER_RETRY_INTERVAL = 60
+
+
+def _get_encoder():
+    """
+    Load the tokenizer used for the message length pre-check on first use.
+    
+    Loading may download the BPE file, so it is kept off the import path; if
+    it fails, None is returned, the token pre-check is skipped and loading
+    is retried on a later request.
+    """
+    global _encoder, _encoder_failed_at
+    if _encoder is not None:
+        return _encoder
+    if _encoder_failed_at is not None and time.monotonic() - _encoder_failed_at < _ENCODER_RETRY_INTERVAL:
+        return None
+    
+    try:
+        _encoder = tiktoken.encoding_for_model("gpt-4o-mini")
+    except Exception as e:
+        _encoder_failed_at = time.monotonic()
+        logger.warning(f"Tokenizer unavailable, skipping token pre-check: {e}")
+        return None
+    return _encoder
+
+
+@loop_scoped_cache(maxsize=32)
+def _cached_agent(key_hash: str, api_key: str):
+    """
+    Return a compiled agent for the given API key, building it on first use.
+    
+    The cache keys on both arguments; the hash is included so the same
+    short identifier can name this key in other per-key caches. Entries are
+    dropped when the event loop changes, since agents hold loop-bound clients.
+    """
+    return create_agent(api_key)
+
+
+def _key_hash(api_key: str) -> str:
+    """Short stable identifier for an API key, used to name per-key caches."""
+    return hashlib.blake2b(api_key.encode(), digest_size=8).hexdigest()
+
+
+def get_agent_for_key(api_key: str):
+    """Get the cached compiled agent for an API key."""
+    return _cached_agent(_key_hash(api_key), api_key)
+
+
+def invalidate_agent_cache():
+    """
+    Drop everything cached per API key (e.g. after a key has been rotated).
+    
+    This clears the compiled agents, the tool-bound models they wrap, the
+    embeddings clients used by the semantic cache and the cached responses.
+    """
+    _cached_agent.cache_clear()
+    clear_model_cache()
+    clear_embedder_cache()
+    clear_response_caches()
+
+
 async def handle_chat(request: ChatRequest) -> ChatResponse:
     """
     Handle a chat request with the LangGraph agent.
@@ -40,29 +137,67 @@ async def handle_chat(request: ChatRequest) -> ChatResponse:
         ChatResponse with agent response and tool calls
         
     Raises:
-        HTTPException: If API key is missing or agent execution fails
+        HTTPException: If API key is missing, the message is too long,
+            or agent execution fails
     """
     try:
-        # Use the provided API key or fall back to global initialization
-        if request.openai_api_key:
-            # Initialize agent with the provided API key for this request
-            current_agent = create_agent(request.openai_api_key)
-        elif get_global_agent():
-            # Use the globally initialized agent
-            current_agent = get_global_agent()
-        else:
+        # Reject or short-circuit trivial and oversized messages up front
+        message = request.message.strip()
+        if not message:
+            return ChatResponse(response="Please ask a question.", tool_calls=[])
+        if len(message) > MAX_MESSAGE_CHARS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Message too long ({len(message)} characters, limit is {MAX_MESSAGE_CHARS})."
+            )
+        encoder = _get_encoder()
+        if encoder is not None:
+            token_count = len(encoder.encode(message))
+            if token_count > MAX_MESSAGE_TOKENS:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Message too long ({token_count} tokens, limit is {MAX_MESSAGE_TOKENS})."
+                )
+        if _GREETING_RE.match(message):
+            return ChatResponse(response=GREETING_RESPONSE, tool_calls=[])
+        
+        # Use the provided API key or fall back to the environment (read lazily,
+        # so this works even where no startup hook has run)
+        api_key = request.api_key or request.openai_api_key or os.getenv("OPENAI_API_KEY")
+        if not api_key:
             raise HTTPException(
                 status_code=400, 
                 detail="OpenAI API key is required. Either provide it in the request or set OPENAI_API_KEY environment variable."
             )
         
-        # Run the agent with the message
-        result = await run_agent(current_agent, request.message)
+        # Reuse the compiled agent for this API key
+        current_agent = get_agent_for_key(api_key)
         
-        return ChatResponse(
+        # Answer near-duplicate messages from this key's semantic cache
+        embedding = None
+        if not request.no_cache:
+            response_cache = get_response_cache(_key_hash(api_key))
+            embedding = await response_cache.embed(request.message, api_key)
+            cached_response = response_cache.lookup(embedding)
+            if cached_response is not None:
+                return cached_response
+        
+        # Run the agent with the message, bounded by the shared concurrency limit
+        result = await agent_limiter.run(current_agent, request.message)
+        
+        response = ChatResponse(
             response=result["response"],
-            tool_calls=result["tool_calls"]
+            tool_calls=list(dict.fromkeys(result["tool_calls"]))  # Remove duplicates, keep call order
+        )
+        
+        # Only cache real answers that can be reproduced for the same question
+        cacheable = (
+            result["response"] != NO_RESPONSE_MESSAGE
+            and NON_DETERMINISTIC_TOOLS.isdisjoint(result["tool_calls"])
         )
+        if embedding is not None and cacheable:
+            response_cache.add(embedding, response)
+        return response
         
     except HTTPException:
         # Re-raise HTTP exceptions as-is
@@ -0,0 +1,54 @@
+"""
+Agent Run Limiter
+
+This module bounds how many agent runs execute at once. Each request starts
+its run immediately and finishes as soon as its own run does; the limit only
+queues runs once too many are already in flight.
+"""
+
+import asyncio
+
+# Import with fallback for both local and Vercel environments
+try:
+    from .agent import run_agent
+except ImportError:
+    # Fallback for local development
+    from api.agent import run_agent
+
+
+class AgentRunLimiter:
+    """
+    Run agents under a shared concurrency limit.
+
+    Each agent run is a multi-step tool loop that cannot be merged with other
+    requests into a single completion call, so concurrent requests are simply
+    run side by side, at most `max_concurrency` at a time.
+    """
+
+    def __init__(self, max_concurrency: int = 16):
+        self.max_concurrency = max_concurrency
+        self._loop = None
+        self._semaphore = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Get the semaphore for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A new loop (e.g. a fresh server or test client) gets a fresh semaphore
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def run(self, agent, message: str):
+        """
+        Run the agent on a message once a concurrency slot is free.
+
+        Returns:
+            Dictionary with 'response' and 'tool_calls' keys, as run_agent
+        """
+        async with self._get_semaphore():
+            return await run_agent(agent, message)
+
+
+# Shared limiter used by the chat endpoint
+agent_limiter = AgentRunLimiter()
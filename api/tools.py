@@ -6,36 +6,74 @@ Each tool is decorated with @tool and provides specific functionality.
 """
 
 import random
+import threading
+from functools import lru_cache
+from urllib.parse import quote
+
 import requests
+from cachetools import TTLCache
 from langchain_core.tools import tool
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+_WIKI_BASE = "https://en.wikipedia.org/api/rest_v1/page/summary/"
 
-@tool
-def get_weather(city: str) -> str:
-    """Returns a dummy weather report for a given city."""
+# (connect, read) timeouts; with one connect retry and no read retries a
+# wiki_search call stays around 11 s worst case, well inside the function's
+# 30 s maxDuration (vercel.json) so the agent can still report the failure
+_WIKI_TIMEOUT = (3, 5)
+
+# Shared session so Wikipedia calls reuse pooled keep-alive connections
+_WIKI_SESSION = requests.Session()
+_WIKI_SESSION.headers.update({
+    "Accept-Encoding": "gzip",
+    "User-Agent": "journey-session05/1.0"
+})
+_WIKI_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=20,
+        max_retries=Retry(total=1, read=0, backoff_factor=0.2)
+    )
+)
+
+# Wikipedia summaries can change, so cached results expire after 10 minutes
+_WIKI_CACHE = TTLCache(maxsize=512, ttl=600)
+_WIKI_CACHE_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=512)
+def _get_weather_impl(city: str) -> str:
     return f"The weather in {city} is sunny with a temperature of 22°C (72°F). Perfect day to go outside!"
 
 
-@tool
-def wiki_search(query: str) -> str:
-    """Searches Wikipedia for a summary of the given query."""
+def _wiki_search_impl(query: str) -> str:
+    # Escaped page title doubles as the cache key, so equivalent queries share an entry
+    title = quote(query.strip().replace(' ', '_'), safe='')
+    with _WIKI_CACHE_LOCK:
+        cached = _WIKI_CACHE.get(title)
+    if cached is not None:
+        return cached
+    
     try:
-        response = requests.get(
-            f"https://en.wikipedia.org/api/rest_v1/page/summary/{query.replace(' ', '_')}",
-            timeout=10
-        )
+        response = _WIKI_SESSION.get(_WIKI_BASE + title, timeout=_WIKI_TIMEOUT)
         if response.status_code == 200:
             data = response.json()
-            return data.get("extract", "No summary available.")
+            summary = data.get("extract", "No summary available.")
         else:
             return f"Wiki search failed with status code: {response.status_code}"
     except Exception as e:
         return f"Wiki search failed: {str(e)}"
+    
+    # Only successful lookups are cached so transient failures are retried
+    with _WIKI_CACHE_LOCK:
+        _WIKI_CACHE[title] = summary
+    return summary
 
 
-@tool
-def fun_fact(topic: str) -> str:
-    """Returns a fun fact about the given topic."""
+@lru_cache(maxsize=512)
+def _fun_fact_impl(topic: str) -> str:
     facts = {
         "pizza": "Did you know that pizza was invented in Naples, Italy, and the first pizzeria opened in 1830?",
         "ocean": "Did you know that we have explored less than 5% of our oceans?",
@@ -46,6 +84,25 @@ def fun_fact(topic: str) -> str:
     return facts.get(topic.lower(), facts["default"])
 
 
+@tool
+def get_weather(city: str) -> str:
+    """Returns a dummy weather report for a given city."""
+    return _get_weather_impl(city)
+
+
+@tool
+def wiki_search(query: str) -> str:
+    """Searches Wikipedia for a summary of the given query."""
+    return _wiki_search_impl(query)
+
+
+@tool
+def fun_fact(topic: str) -> str:
+    """Returns a fun fact about the given topic."""
+    return _fun_fact_impl(topic)
+
+
+# random_color is non-deterministic by design, so it is never cached
 @tool
 def random_color(colors: list[str]) -> str:
     """Randomly selects a color from a given list of strings."""
@@ -59,6 +116,12 @@ def random_color(colors: list[str]) -> str:
 # Export all tools
 AVAILABLE_TOOLS = [get_weather, wiki_search, fun_fact, random_color]
 
+# Tool lookup by name for dispatching model tool calls
+TOOL_BY_NAME = {t.name: t for t in AVAILABLE_TOOLS}
+
+# Tools whose output varies between identical calls; their results must not be reused
+NON_DETERMINISTIC_TOOLS = frozenset({"random_color"})
+
 # Tool descriptions for API documentation
 TOOL_DESCRIPTIONS = [
     {